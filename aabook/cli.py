@@ -1,10 +1,12 @@
-import json
+import asyncio
 import os
 import sys
 import time
 from pathlib import Path
 from typing import Optional
 
+import orjson
+
 # Handle both direct execution and module execution
 if __name__ == "__main__":
     # When run directly, add the parent directory to path for absolute imports
@@ -14,15 +16,19 @@ if __name__ == "__main__":
     
     from llm_client import LLMClient
     from speaker_identification import (
-        extract_present_characters,
-        label_lines_with_speakers,
+        annotate_lines_batch_async,
+        extract_present_characters_async,
+        format_sentence_with_annotations,
+        label_lines_with_speakers_async,
     )
 else:
     # When run as module, use relative imports
     from .llm_client import LLMClient
     from .speaker_identification import (
-        extract_present_characters,
-        label_lines_with_speakers,
+        annotate_lines_batch_async,
+        extract_present_characters_async,
+        format_sentence_with_annotations,
+        label_lines_with_speakers_async,
     )
 
 
@@ -144,10 +150,11 @@ def main() -> int:
     
     # Process the file
     print(f"\n[1/6] Loading input: {input_file}")
-    with open(input_file, "r", encoding="utf-8") as f:
-        chapter_text = f.read()
+    # Count newlines on the raw bytes (1 byte each in UTF-8) and decode once.
+    raw = Path(input_file).read_bytes()
+    num_lines = raw.count(b"\n") + (1 if raw else 0)
+    chapter_text = raw.decode("utf-8")
     num_chars = len(chapter_text)
-    num_lines = chapter_text.count("\n") + (1 if chapter_text else 0)
     print(f"      Loaded {num_chars} characters across {num_lines} lines.")
 
     print(f"[2/6] Initializing LLM client (model: {model})")
@@ -160,119 +167,147 @@ def main() -> int:
         print("      Make sure your OPENAI_API_KEY is set in .env file")
         return 3
 
-    print("[3/6] Extracting present characters...")
-    t1 = time.perf_counter()
-    try:
-        characters = extract_present_characters(chapter_text, llm)
-        dt1 = time.perf_counter() - t1
-        preview = ", ".join(characters[:10]) + ("..." if len(characters) > 10 else "")
-        print(f"      Found {len(characters)} characters: {preview} (in {dt1:.2f}s)")
-    except Exception as e:
-        print(f"      Error extracting characters: {e}")
-        return 4
+    # Steps 3-5 run under a single event loop: pooled keep-alive connections
+    # are bound to the loop that created them, so one asyncio.run per stage
+    # would reuse stale sockets at every stage boundary.
+    async def _countdown(seconds: int) -> None:
+        # Wait between heavy LLM operations to avoid rate limits
+        print(f"\n⏳ Waiting {seconds} seconds before next heavy processing step...")
+        for remaining in range(seconds, 0, -1):
+            print(f"   {remaining} seconds remaining...", end='\r')
+            await asyncio.sleep(1)
+        print("   ✓ Ready to continue!                    ")
 
-    # Wait between heavy LLM operations to avoid rate limits
-    print("\n⏳ Waiting 10 seconds before next heavy processing step...")
-    for remaining in range(10, 0, -1):
-        print(f"   {remaining} seconds remaining...", end='\r')
-        time.sleep(1)
-    print("   ✓ Ready to continue!                    ")
+    async def _pipeline():
+        print("[3/6] Extracting present characters...")
+        t1 = time.perf_counter()
+        try:
+            characters = await extract_present_characters_async(chapter_text, llm)
+            dt1 = time.perf_counter() - t1
+            preview = ", ".join(characters[:10]) + ("..." if len(characters) > 10 else "")
+            print(f"      Found {len(characters)} characters: {preview} (in {dt1:.2f}s)")
+        except Exception as e:
+            print(f"      Error extracting characters: {e}")
+            return 4
 
-    print("\n[4/6] Labeling lines with speakers...")
-    t2 = time.perf_counter()
-    try:
-        lines = label_lines_with_speakers(chapter_text, characters, llm)
-        dt2 = time.perf_counter() - t2
-        print(f"      Labeled {len(lines)} lines (in {dt2:.2f}s)")
-    except Exception as e:
-        print(f"      Error labeling lines: {e}")
-        return 5
+        await _countdown(10)
+
+        print("\n[4/6] Labeling lines with speakers...")
+        t2 = time.perf_counter()
+        try:
+            lines = await label_lines_with_speakers_async(chapter_text, characters, llm)
+            dt2 = time.perf_counter() - t2
+            print(f"      Labeled {len(lines)} lines (in {dt2:.2f}s)")
+        except Exception as e:
+            print(f"      Error labeling lines: {e}")
+            return 5
+
+        await _countdown(20)
+
+        print("\n[5/6] Detecting emotions, tones, sfx...")
+        total_lines = len(lines)
 
-    # Wait between heavy LLM operations to avoid rate limits
-    print("\n⏳ Waiting 20 seconds before next heavy processing step...")
-    for remaining in range(20, 0, -1):
-        print(f"   {remaining} seconds remaining...", end='\r')
-        time.sleep(1)
-    print("   ✓ Ready to continue!                    ")
+        # Pack sentences into batches so the long system prompts and network
+        # round-trip are amortized across many lines per request, then fire the
+        # batches concurrently with a cap on in-flight requests. Each batch
+        # call returns emotion, tone, and SFX together, so every line's text
+        # crosses the network once.
+        batch_size = 32
+        batches = []
+        for start in range(0, total_lines, batch_size):
+            batches.append([
+                {"id": start + j, "speaker": line["speaker"], "text": line["text"]}
+                for j, line in enumerate(lines[start:start + batch_size])
+            ])
+
+        semaphore = asyncio.Semaphore(llm.concurrency_limit)
+
+        async def _bounded(coro):
+            async with semaphore:
+                return await coro
+
+        print(f"      Dispatching {total_lines} sentences in {len(batches)} batches of up to {batch_size}...")
+        try:
+            tasks = [
+                _bounded(annotate_lines_batch_async(batch, llm))
+                for batch in batches
+            ]
+            annotations = {}
+            for result_map in await asyncio.gather(*tasks):
+                annotations.update(result_map)
+        except Exception as e:
+            print(f"      Error detecting emotions, tones, and sound effects: {e}")
+            return 6
+        return characters, lines, annotations
 
-    print("\n[5/6] Detecting emotions, tones, sfx...")
     t3 = time.perf_counter()
+    outcome = asyncio.run(_pipeline())
+    if isinstance(outcome, int):
+        return outcome
+    characters, lines, annotations = outcome
+
     try:
-        # Process each line to add emotion and tone detection
-        processed_sentences = {}
-        total_lines = len(lines)
-        
+        # Collect records in order for the list written at output time.
+        processed_list = []
         for i, line in enumerate(lines):
-            sentence_id = f"sentence_{i+1:04d}"
             text = line["text"]
             speaker = line["speaker"]
-            
-            # Progress indicator
-            if i % 10 == 0:
-                print(f"      Processing sentence {i+1}/{total_lines}...")
-            
-            # Detect emotion and tone
-            from speaker_identification import detect_emotion_and_tone, detect_sound_effects, format_sentence_with_annotations
-            emotion_data = detect_emotion_and_tone(text, speaker, llm)
-            
-            # Detect sound effects
-            sfx_data = detect_sound_effects(text, llm)
-            
+            annotation = annotations[i]
+
             # Format sentence with inline annotations
             formatted_sentence = format_sentence_with_annotations(
                 text,
-                emotion_data["emotion"],
-                emotion_data["tone"],
-                sfx_data["sound_events"]
+                annotation["emotion"],
+                annotation["tone"],
+                annotation["sound_events"]
             )
-            
-            processed_sentences[sentence_id] = {
+
+            processed_list.append({
+                "id": i + 1,
                 "sentence": text,
                 "formatted_sentence": formatted_sentence,
                 "speaker_info": {
                     "speaker": speaker,
-                    "emotion": emotion_data["emotion"],
-                    "tone": emotion_data["tone"]
+                    "emotion": annotation["emotion"],
+                    "tone": annotation["tone"]
                 },
                 "sfx_info": {
-                    "actions": sfx_data["actions"],
-                    "action_description": sfx_data["action_description"],
-                    "sound_events": sfx_data["sound_events"]
+                    "actions": annotation["actions"],
+                    "action_description": annotation["action_description"],
+                    "sound_events": annotation["sound_events"]
                 }
-            }
-            
-            # Add small wait every 20 sentences to avoid rate limits
-            if (i + 1) % 20 == 0 and (i + 1) < total_lines:
-                print(f"      ⏳ Brief pause (10s) after {i+1} sentences...")
-                for remaining in range(10, 0, -1):
-                    print(f"         {remaining}s remaining...", end='\r')
-                    time.sleep(1)
-                print("         ✓ Continuing...                    ")
-        
+            })
+
         dt3 = time.perf_counter() - t3
-        print(f"      Processed {len(processed_sentences)} sentences (in {dt3:.2f}s)")
+        print(f"      Processed {len(processed_list)} sentences (in {dt3:.2f}s)")
     except Exception as e:
         print(f"      Error detecting emotions, tones, and sound effects: {e}")
         return 6
 
-    result = {"characters": characters, "sentences": processed_sentences}
+    # Sentences are an ordered list with numeric ids; insertion order carries
+    # the sequence, so no zero-padded string keys to build or re-sort.
+    result = {
+        "characters": characters,
+        "sentences": processed_list,
+    }
 
     print("[6/6] Writing output")
     try:
         os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        # Single C-pass serialization straight to bytes; no intermediate
+        # Python-level string building for large chapters.
+        Path(output_file).write_bytes(orjson.dumps(result, option=orjson.OPT_INDENT_2))
         print(f"      Wrote JSON to: {output_file}")
     except Exception as e:
         print(f"      Error writing output: {e}")
         return 7
     
     # Count sentences with SFX
-    sfx_count = sum(1 for data in processed_sentences.values() if data["sfx_info"]["sound_events"])
+    sfx_count = sum(1 for data in processed_list if data["sfx_info"]["sound_events"])
     
     print("\n✅ Processing complete!")
     print(f"   Characters found: {len(characters)}")
-    print(f"   Sentences processed: {len(processed_sentences)}")
+    print(f"   Sentences processed: {len(processed_list)}")
     print(f"   Sentences with sound effects: {sfx_count}")
     print(f"   Output saved: {output_file}")
     
@@ -12,11 +12,12 @@ Example:
     Output: novel_2/chapter_1_full_stitched.txt
 """
 
-import json
 import sys
 import os
 from pathlib import Path
 
+import orjson
+
 
 def extract_formatted_sentences(json_path: str) -> str:
     """
@@ -30,25 +31,32 @@ def extract_formatted_sentences(json_path: str) -> str:
     """
     # Read the JSON file
     print(f"Reading {json_path}...")
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    # Get sentences dictionary
-    sentences = data.get('sentences', {})
+    data = orjson.loads(Path(json_path).read_bytes())
     
+    # Get sentences: newer files store an ordered list, older ones a dict
+    # keyed by sentence_0001-style ids.
+    sentences = data.get('sentences', [])
+
     if not sentences:
         print("Warning: No sentences found in JSON file.")
         return None
-    
-    # Sort sentence IDs to maintain order (sentence_0001, sentence_0002, etc.)
-    sentence_ids = sorted(sentences.keys())
-    
+
+    if isinstance(sentences, dict):
+        # Sort legacy sentence IDs numerically (sentence_0001, sentence_0002,
+        # etc.); integer compares are faster than character-by-character
+        # string compares and stay correct if the zero-padding width changes.
+        ordered = [
+            sentences[k]
+            for k in sorted(sentences.keys(), key=lambda k: int(k.rsplit('_', 1)[1]))
+        ]
+    else:
+        ordered = sentences
+
     # Extract formatted sentences
     formatted_sentences = []
     missing_count = 0
-    
-    for sentence_id in sentence_ids:
-        sentence_data = sentences[sentence_id]
+
+    for sentence_data in ordered:
         formatted = sentence_data.get('formatted_sentence')
         
         if formatted:
@@ -67,11 +75,9 @@ def extract_formatted_sentences(json_path: str) -> str:
     input_path = Path(json_path)
     output_path = input_path.with_suffix('.txt')
     
-    # Write to text file
+    # Write to text file in one call instead of one write per line
     print(f"Writing to {output_path}...")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        for sentence in formatted_sentences:
-            f.write(sentence + '\n')
+    output_path.write_text('\n'.join(formatted_sentences) + '\n', encoding='utf-8')
     
     print(f"Successfully created {output_path}")
     print(f"   Total lines: {len(formatted_sentences)}")
@@ -107,7 +113,7 @@ def main():
             return 0
         else:
             return 3
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         print(f"Error: Invalid JSON file: {e}")
         return 4
     except Exception as e:
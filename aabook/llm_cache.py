@@ -0,0 +1,74 @@
+"""Exact-match cache for LLM JSON responses.
+
+A small in-memory LRU sits in front of an on-disk store (one file per key),
+so repeat prompts within a run never touch the filesystem and repeat runs
+never touch the API. Keys are derived from every input that affects the
+response: model, prompts, sampling parameters, and response schema.
+"""
+
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import orjson
+
+
+class LLMCache:
+    def __init__(
+        self,
+        cache_dir: Optional[str],
+        max_memory_entries: int = 4096,
+    ) -> None:
+        self.enabled = cache_dir is not None
+        self._dir = Path(cache_dir) if cache_dir else None
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._max_memory_entries = max_memory_entries
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(**parts: Any) -> str:
+        """Hash all request-identifying parts into a stable cache key."""
+        raw = orjson.dumps(parts, option=orjson.OPT_SORT_KEYS)
+        return hashlib.blake2b(raw, digest_size=32).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return value
+        try:
+            with open(self._dir / f"{key}.json", "rb") as f:
+                value = orjson.loads(f.read())
+        except (OSError, ValueError):
+            # Missing or corrupt entry: treat as a miss
+            self.misses += 1
+            return None
+        self._remember(key, value)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        self._remember(key, value)
+        try:
+            self._dir.mkdir(parents=True, exist_ok=True)
+            with open(self._dir / f"{key}.json", "wb") as f:
+                f.write(orjson.dumps(value))
+        except OSError:
+            # Caching is best-effort; never fail the request over it
+            pass
+
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
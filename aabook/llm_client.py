@@ -1,9 +1,27 @@
-import json
+import asyncio
 import os
+import random
 import re
+import time
 from typing import Any, Dict, Optional
 
-from openai import OpenAI
+import httpx
+import orjson
+
+from openai import APIConnectionError, APITimeoutError, AsyncOpenAI, OpenAI, RateLimitError
+
+# ijson enables incremental parsing of streamed completions; optional, the
+# streaming entry point falls back to parsing the full response without it.
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    from .llm_cache import LLMCache
+except ImportError:
+    # Direct execution with the aabook directory on sys.path
+    from llm_cache import LLMCache
 
 # Auto-load environment variables from a local .env file if present
 try:
@@ -13,6 +31,27 @@ except Exception:
     # If python-dotenv is not installed, ignore; env vars can still come from the shell
     pass
 
+# Compiled once; only used on the lenient recovery path.
+_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+
+# Transient failures worth retrying; anything else propagates immediately.
+_RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError)
+_MAX_ATTEMPTS = 6
+_BACKOFF_MAX_SECONDS = 30.0
+
+
+def _retry_delay(exc: Exception, attempt: int) -> float:
+    """Jittered exponential backoff, preferring the server's Retry-After."""
+    response = getattr(exc, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), _BACKOFF_MAX_SECONDS)
+            except ValueError:
+                pass
+    return random.uniform(1.0, min(2.0 ** attempt, _BACKOFF_MAX_SECONDS))
+
 
 class LLMClient:
     """Thin wrapper around OpenAI chat completions optimized for JSON outputs."""
@@ -22,33 +61,151 @@ class LLMClient:
         model: str = "gpt-4o-mini",
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
+        cache_dir: Optional[str] = ".aabook_cache",
+        concurrency_limit: int = 50,
+        classifier_model: Optional[str] = None,
     ) -> None:
         self.model = model
+        # Cheaper model for the high-volume per-sentence classification pass;
+        # defaults to the main model when not set.
+        self.classifier_model = classifier_model or model
+        # Exact-match response cache (memory LRU + disk); cache_dir=None disables.
+        self._cache = LLMCache(cache_dir)
+        # Callers size their asyncio.Semaphore from this so the in-flight cap
+        # and the connection pool below stay in sync.
+        self.concurrency_limit = concurrency_limit
         effective_api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not effective_api_key:
             raise RuntimeError(
                 "OPENAI_API_KEY is not set. Provide via .env, env var, or LLMClient(api_key=...)."
             )
 
-        client_kwargs: Dict[str, Any] = {"api_key": effective_api_key}
+        # max_retries=0 disables the SDK's built-in retry (default 2) so the
+        # _request backoff loop below is the only retry policy in effect;
+        # stacking both multiplies attempts and hides transport errors.
+        client_kwargs: Dict[str, Any] = {"api_key": effective_api_key, "max_retries": 0}
         if base_url:
             client_kwargs["base_url"] = base_url
-        self._client = OpenAI(**client_kwargs)
 
-    def _extract_json(self, content: str) -> Dict[str, Any]:
-        """Attempt to parse JSON from a model response, robust to extra text or fences."""
+        # Size the connection pool to the fan-out so concurrent requests reuse
+        # warm connections instead of queueing on httpx defaults or paying
+        # fresh TCP/TLS handshakes.
+        limits = httpx.Limits(
+            max_connections=max(2 * concurrency_limit, 100),
+            max_keepalive_connections=max(concurrency_limit, 20),
+            keepalive_expiry=30.0,
+        )
+        timeout = httpx.Timeout(connect=5.0, read=60.0, write=10.0, pool=5.0)
+        # HTTP/2 multiplexes concurrent requests over one TLS connection,
+        # avoiding per-request handshakes under fan-out. It needs the optional
+        # h2 package; without it, stay on pooled HTTP/1.1.
+        try:
+            http_client = httpx.Client(http2=True, limits=limits, timeout=timeout)
+            self._http2 = True
+        except ImportError:
+            http_client = httpx.Client(limits=limits, timeout=timeout)
+            self._http2 = False
+        self._client = OpenAI(http_client=http_client, **client_kwargs)
+        # The async client is created lazily, bound to the event loop that
+        # first uses it; see _get_aclient.
+        self._limits = limits
+        self._timeout = timeout
+        self._client_kwargs = client_kwargs
+        self._aclient: Optional[AsyncOpenAI] = None
+        self._aclient_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_aclient(self) -> AsyncOpenAI:
+        """Async client bound to the currently running event loop.
+
+        Keep-alive connections belong to the loop that created them. Reusing
+        them from a later asyncio.run() flushes the request over the stale
+        socket (the server executes it) and then fails on the response read,
+        which upstream retry logic turns into a duplicate request. So each
+        new loop gets a fresh client; the previous loop's pool cannot be
+        closed from here and is left to garbage collection.
+        """
+        loop = asyncio.get_running_loop()
+        if self._aclient is None or self._aclient_loop is not loop:
+            self._aclient = AsyncOpenAI(
+                http_client=httpx.AsyncClient(
+                    http2=self._http2, limits=self._limits, timeout=self._timeout
+                ),
+                **self._client_kwargs,
+            )
+            self._aclient_loop = loop
+        return self._aclient
+
+    def close(self) -> None:
+        """Release the pooled HTTP connections held by the sync client."""
+        self._client.close()
+
+    async def aclose(self) -> None:
+        """Release the pooled HTTP connections held by the async client."""
+        if self._aclient is not None and self._aclient_loop is asyncio.get_running_loop():
+            await self._aclient.close()
+        self._aclient = None
+        self._aclient_loop = None
+
+    def __enter__(self) -> "LLMClient":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _cache_key(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        extra: str = "",
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> str:
+        return LLMCache.key(
+            model=model or self.model,
+            system=system_prompt,
+            user=user_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            extra=extra,
+        )
+
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._cache.get(key)
+
+    def _cache_put(self, key: str, value: Dict[str, Any]) -> None:
+        self._cache.put(key, value)
+
+    def cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up an arbitrary JSON value in the response cache (None on miss)."""
+        return self._cache.get(key)
+
+    def cache_put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store an arbitrary JSON value in the response cache (best-effort)."""
+        self._cache.put(key, value)
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Hit/miss counters for the response cache."""
+        return self._cache.stats()
+
+    def _extract_json_lenient(self, content: str) -> Dict[str, Any]:
+        """Attempt to parse JSON from a model response, robust to extra text or fences.
+
+        Only needed when the request did not use JSON mode; chat_json responses
+        are guaranteed parseable and take the direct orjson.loads fast path.
+        """
         # Try direct parse first
         try:
-            return json.loads(content)
+            return orjson.loads(content)
         except Exception:
             pass
 
         # Remove code fences if present
-        fenced_match = re.search(r"```(?:json)?\n([\s\S]*?)\n```", content)
+        fenced_match = _FENCE_RE.search(content)
         if fenced_match:
             fenced = fenced_match.group(1)
             try:
-                return json.loads(fenced)
+                return orjson.loads(fenced)
             except Exception:
                 content = fenced  # fall through to brace slicing
 
@@ -57,11 +214,60 @@ class LLMClient:
         end = content.rfind("}")
         if start != -1 and end != -1 and end > start:
             try:
-                return json.loads(content[start : end + 1])
+                return orjson.loads(content[start : end + 1])
             except Exception:
                 pass
         raise ValueError("Model response did not contain valid JSON.")
 
+    def _completion_kwargs(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+        response_format: Dict[str, Any],
+        model: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        return {
+            "model": model or self.model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "response_format": response_format,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+        }
+
+    def _request(self, request_kwargs: Dict[str, Any]) -> str:
+        for attempt in range(1, _MAX_ATTEMPTS + 1):
+            try:
+                completion = self._client.chat.completions.create(**request_kwargs)
+                break
+            except _RETRYABLE_ERRORS as e:
+                if attempt == _MAX_ATTEMPTS:
+                    raise
+                time.sleep(_retry_delay(e, attempt))
+        return completion.choices[0].message.content or "{}"
+
+    async def _request_async(self, request_kwargs: Dict[str, Any]) -> str:
+        for attempt in range(1, _MAX_ATTEMPTS + 1):
+            try:
+                completion = await self._get_aclient().chat.completions.create(**request_kwargs)
+                break
+            except _RETRYABLE_ERRORS as e:
+                if attempt == _MAX_ATTEMPTS:
+                    raise
+                await asyncio.sleep(_retry_delay(e, attempt))
+        return completion.choices[0].message.content or "{}"
+
+    @staticmethod
+    def _schema_response_format(schema: Dict[str, Any], schema_name: str) -> Dict[str, Any]:
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": schema_name, "schema": schema, "strict": True},
+        }
+
     def chat_json(
         self,
         system_prompt: str,
@@ -69,16 +275,276 @@ class LLMClient:
         *,
         temperature: float = 0.2,
         max_tokens: int = 2000,
+        no_cache: bool = False,
+        strict: bool = True,
     ) -> Dict[str, Any]:
-        completion = self._client.chat.completions.create(
-            model=self.model,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            response_format={"type": "json_object"},
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+        key = self._cache_key(system_prompt, user_prompt,
+                              temperature=temperature, max_tokens=max_tokens)
+        if not no_cache:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+        content = self._request(self._completion_kwargs(
+            system_prompt, user_prompt, temperature, max_tokens, {"type": "json_object"},
+        ))
+        # JSON mode guarantees parseable output, so parse directly; the lenient
+        # fence/brace recovery is only for callers that opt out with strict=False.
+        result = orjson.loads(content) if strict else self._extract_json_lenient(content)
+        if not no_cache:
+            self._cache_put(key, result)
+        return result
+
+    async def chat_json_async(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        *,
+        temperature: float = 0.2,
+        max_tokens: int = 2000,
+        no_cache: bool = False,
+        strict: bool = True,
+    ) -> Dict[str, Any]:
+        """Async variant of chat_json; lets callers overlap many requests with asyncio.gather."""
+        key = self._cache_key(system_prompt, user_prompt,
+                              temperature=temperature, max_tokens=max_tokens)
+        if not no_cache:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+        content = await self._request_async(self._completion_kwargs(
+            system_prompt, user_prompt, temperature, max_tokens, {"type": "json_object"},
+        ))
+        result = orjson.loads(content) if strict else self._extract_json_lenient(content)
+        if not no_cache:
+            self._cache_put(key, result)
+        return result
+
+    def chat_json_cheap(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        *,
+        temperature: float = 0.2,
+        max_tokens: int = 2000,
+        no_cache: bool = False,
+        strict: bool = True,
+    ) -> Dict[str, Any]:
+        """chat_json routed to the cheaper classifier model."""
+        key = self._cache_key(system_prompt, user_prompt, model=self.classifier_model,
+                              temperature=temperature, max_tokens=max_tokens)
+        if not no_cache:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+        content = self._request(self._completion_kwargs(
+            system_prompt, user_prompt, temperature, max_tokens,
+            {"type": "json_object"}, model=self.classifier_model,
+        ))
+        result = orjson.loads(content) if strict else self._extract_json_lenient(content)
+        if not no_cache:
+            self._cache_put(key, result)
+        return result
+
+    async def chat_json_cheap_async(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        *,
+        temperature: float = 0.2,
+        max_tokens: int = 2000,
+        no_cache: bool = False,
+        strict: bool = True,
+    ) -> Dict[str, Any]:
+        """Async variant of chat_json_cheap."""
+        key = self._cache_key(system_prompt, user_prompt, model=self.classifier_model,
+                              temperature=temperature, max_tokens=max_tokens)
+        if not no_cache:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+        content = await self._request_async(self._completion_kwargs(
+            system_prompt, user_prompt, temperature, max_tokens,
+            {"type": "json_object"}, model=self.classifier_model,
+        ))
+        result = orjson.loads(content) if strict else self._extract_json_lenient(content)
+        if not no_cache:
+            self._cache_put(key, result)
+        return result
+
+    def chat_structured(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        schema: Dict[str, Any],
+        *,
+        schema_name: str = "out",
+        temperature: float = 0.2,
+        max_tokens: int = 2000,
+        no_cache: bool = False,
+    ) -> Dict[str, Any]:
+        """Chat completion constrained to a JSON Schema via Structured Outputs.
+
+        The response is guaranteed to match the schema, so there is no
+        recovery parsing and no wasted tokens on formatting scaffolding.
+        """
+        key = self._cache_key(system_prompt, user_prompt, extra=orjson.dumps(schema).decode(),
+                              temperature=temperature, max_tokens=max_tokens)
+        if not no_cache:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+        content = self._request(self._completion_kwargs(
+            system_prompt, user_prompt, temperature, max_tokens,
+            self._schema_response_format(schema, schema_name),
+        ))
+        result = orjson.loads(content)
+        if not no_cache:
+            self._cache_put(key, result)
+        return result
+
+    async def chat_structured_async(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        schema: Dict[str, Any],
+        *,
+        schema_name: str = "out",
+        temperature: float = 0.2,
+        max_tokens: int = 2000,
+        no_cache: bool = False,
+    ) -> Dict[str, Any]:
+        """Async variant of chat_structured."""
+        key = self._cache_key(system_prompt, user_prompt, extra=orjson.dumps(schema).decode(),
+                              temperature=temperature, max_tokens=max_tokens)
+        if not no_cache:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+        content = await self._request_async(self._completion_kwargs(
+            system_prompt, user_prompt, temperature, max_tokens,
+            self._schema_response_format(schema, schema_name),
+        ))
+        result = orjson.loads(content)
+        if not no_cache:
+            self._cache_put(key, result)
+        return result
+
+    def chat_structured_cheap(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        schema: Dict[str, Any],
+        *,
+        schema_name: str = "out",
+        temperature: float = 0.2,
+        max_tokens: int = 2000,
+        no_cache: bool = False,
+    ) -> Dict[str, Any]:
+        """chat_structured routed to the cheaper classifier model."""
+        key = self._cache_key(system_prompt, user_prompt, extra=orjson.dumps(schema).decode(),
+                              model=self.classifier_model,
+                              temperature=temperature, max_tokens=max_tokens)
+        if not no_cache:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+        content = self._request(self._completion_kwargs(
+            system_prompt, user_prompt, temperature, max_tokens,
+            self._schema_response_format(schema, schema_name),
+            model=self.classifier_model,
+        ))
+        result = orjson.loads(content)
+        if not no_cache:
+            self._cache_put(key, result)
+        return result
+
+    async def chat_structured_cheap_async(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        schema: Dict[str, Any],
+        *,
+        schema_name: str = "out",
+        temperature: float = 0.2,
+        max_tokens: int = 2000,
+        no_cache: bool = False,
+    ) -> Dict[str, Any]:
+        """Async variant of chat_structured_cheap."""
+        key = self._cache_key(system_prompt, user_prompt, extra=orjson.dumps(schema).decode(),
+                              model=self.classifier_model,
+                              temperature=temperature, max_tokens=max_tokens)
+        if not no_cache:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+        content = await self._request_async(self._completion_kwargs(
+            system_prompt, user_prompt, temperature, max_tokens,
+            self._schema_response_format(schema, schema_name),
+            model=self.classifier_model,
+        ))
+        result = orjson.loads(content)
+        if not no_cache:
+            self._cache_put(key, result)
+        return result
+
+    async def chat_json_stream_async(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        items_path: str,
+        *,
+        temperature: float = 0.2,
+        max_tokens: int = 2000,
+    ):
+        """Stream a JSON-mode completion, yielding array items as they complete.
+
+        items_path is an ijson path such as "lines.item". With ijson
+        installed, each item is yielded while the model is still generating,
+        so downstream work can overlap with the remaining generation time.
+        Without ijson the full response is parsed at the end and the items
+        are yielded in one burst. Streamed responses are not cached: the
+        caller consumes items, not the final document.
+        """
+        request_kwargs = self._completion_kwargs(
+            system_prompt, user_prompt, temperature, max_tokens, {"type": "json_object"},
         )
-        content = completion.choices[0].message.content or "{}"
-        return self._extract_json(content)
+        for attempt in range(1, _MAX_ATTEMPTS + 1):
+            try:
+                stream = await self._get_aclient().chat.completions.create(
+                    stream=True, **request_kwargs
+                )
+                break
+            except _RETRYABLE_ERRORS as e:
+                if attempt == _MAX_ATTEMPTS:
+                    raise
+                await asyncio.sleep(_retry_delay(e, attempt))
+
+        if ijson is None:
+            pieces = []
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    pieces.append(chunk.choices[0].delta.content)
+            for item in self._items_at_path(orjson.loads("".join(pieces) or "{}"), items_path):
+                yield item
+            return
+
+        items = ijson.sendable_list()
+        parser = ijson.items_coro(items, items_path)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parser.send(chunk.choices[0].delta.content.encode())
+                while items:
+                    yield items.pop(0)
+        parser.close()
+        while items:
+            yield items.pop(0)
+
+    @staticmethod
+    def _items_at_path(document: Dict[str, Any], items_path: str):
+        """Resolve an ijson-style path like "lines.item" against a parsed dict."""
+        node: Any = document
+        for part in items_path.split("."):
+            if part == "item":
+                return node if isinstance(node, list) else []
+            node = node.get(part, {}) if isinstance(node, dict) else {}
+        return []
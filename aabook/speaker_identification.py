@@ -1,7 +1,19 @@
-from typing import Dict, List, Any
+import asyncio
+import hashlib
+import re
+from typing import Dict, List, Any, Optional
 import sys
 import os
 
+import orjson
+
+# pyahocorasick matches every trigger phrase in one pass over the sentence;
+# optional, the str.find loop below covers the common few-trigger case fine.
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 # Handle both direct execution and module execution
 # Check if we're being imported by a direct execution of cli.py
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -17,11 +29,14 @@ else:
         from llm_client import LLMClient
 
 
+# All prompts below are module-level constants assembled once at import, and
+# user prompts always put the static template text before the variable
+# chapter/line content. Keeping every request's prefix byte-identical is what
+# lets provider-side prompt caching skip re-processing the shared tokens.
 CHARACTER_SYSTEM_PROMPT = (
     "You are a precise literary analysis assistant. Given a chapter's raw text, "
     "identify the distinct characters who are present and could plausibly speak.\n"
     "Rules:\n"
-    "- Return a JSON object: {\"characters\": [string]} only.\n"
     "- Use canonical names (e.g., \"Mr. Darcy\" not \"Darcy\" if both appear).\n"
     "- Include \"Narrator\" as a special non-character for descriptive narration.\n"
     "- Exclude generic groups (e.g., \"crowd\", \"villagers\") unless named/recurring.\n"
@@ -39,7 +54,6 @@ LABEL_SYSTEM_PROMPT = (
     "Given a chapter's raw text and a list of present characters, segment the text into an ordered array of lines.\n"
     "Each line should be either spoken dialogue attributed to a specific character or narrator text attributed to \"Narrator\".\n"
     "Rules:\n"
-    "- Return JSON only: {\"lines\": [{\"speaker\": string, \"text\": string}]}.\n"
     "- Preserve the original order of the text.\n"
     "- Preserve punctuation and wording for each line as it appears in the text.\n"
     "- Only use speaker names from the provided character list, plus \"Narrator\".\n"
@@ -49,16 +63,47 @@ LABEL_SYSTEM_PROMPT = (
     "- Avoid adding inferred content that does not appear in the text."
 )
 
+# Fixed vocabularies for emotion/tone classification. The model returns the
+# integer index into these tuples (multi-word labels like "matter-of-fact"
+# cost several output tokens; an index costs one) and the client decodes.
+EMOTIONS = (
+    "neutral", "happy", "sad", "angry", "fearful", "surprised", "disgusted",
+    "excited", "anxious", "calm", "frustrated", "hopeful", "disappointed",
+    "confused", "determined", "suspicious", "relieved", "guilty", "proud",
+    "ashamed", "jealous", "grateful", "lonely", "content", "overwhelmed",
+    "bored", "curious", "embarrassed", "confident", "vulnerable",
+)
+
+TONES = (
+    "formal", "informal", "casual", "serious", "playful", "sarcastic",
+    "sincere", "ironic", "dramatic", "matter-of-fact", "urgent", "gentle",
+    "harsh", "encouraging", "critical", "supportive", "condescending",
+    "respectful", "disrespectful", "friendly", "hostile", "warm", "cold",
+    "enthusiastic", "indifferent", "optimistic", "pessimistic", "confident",
+    "uncertain", "authoritative", "submissive", "assertive", "passive",
+    "aggressive", "defensive", "apologetic", "accusatory", "questioning",
+    "declarative", "exclamatory", "narrative", "descriptive", "persuasive",
+    "informative",
+)
+
+
+def _numbered(options) -> str:
+    return ", ".join(f"{i}={name}" for i, name in enumerate(options))
+
+
+# Shared rule text for the emotion/tone analysis, reused by the single-purpose
+# and fused annotation prompts below.
+_EMOTION_GUIDELINES = (
+    "- 'e': emotion, as the number of one of: " + _numbered(EMOTIONS) + ".\n"
+    "- 't': tone, as the number of one of: " + _numbered(TONES) + ".\n"
+    "- Judge from context, wording, and punctuation; for narrator text use the emotional atmosphere being described, for dialogue include implied undertones."
+)
+
 EMOTION_SYSTEM_PROMPT = (
     "You are an emotion detection assistant.\n"
     "Given a piece of text and its speaker, analyze the emotional content and tone.\n"
     "Rules:\n"
-    "- Return JSON only: {\"emotion\": string, \"tone\": string}.\n"
-    "- For emotion, choose from: neutral, happy, sad, angry, fearful, surprised, disgusted, excited, anxious, calm, frustrated, hopeful, disappointed, confused, determined, suspicious, relieved, guilty, proud, ashamed, jealous, grateful, lonely, content, overwhelmed, bored, curious, embarrassed, confident, vulnerable.\n"
-    "- For tone, choose from: formal, informal, casual, serious, playful, sarcastic, sincere, ironic, dramatic, matter-of-fact, urgent, gentle, harsh, encouraging, critical, supportive, condescending, respectful, disrespectful, friendly, hostile, warm, cold, enthusiastic, indifferent, optimistic, pessimistic, confident, uncertain, authoritative, submissive, assertive, passive, aggressive, defensive, apologetic, accusatory, questioning, declarative, exclamatory, narrative, descriptive, persuasive, informative.\n"
-    "- Consider the context, word choice, punctuation, and speaker characteristics.\n"
-    "- For narrator text, focus on the emotional atmosphere being described.\n"
-    "- For dialogue, consider both the literal meaning and implied emotional undertones."
+    + _EMOTION_GUIDELINES
 )
 
 LABEL_USER_PROMPT_TEMPLATE = (
@@ -72,31 +117,21 @@ EMOTION_USER_PROMPT_TEMPLATE = (
     "Analyze the emotion and tone of this text."
 )
 
+# Shared rule text for action/sound-effect extraction, reused by the
+# single-purpose and fused annotation prompts below.
+_SFX_GUIDELINES = (
+    "- 'actions': every action in the text, whether it produces sound or not.\n"
+    "- 'action_description': one verb-noun phrase per action (e.g., \"glass breaking on floor\"), same count and order as 'actions'.\n"
+    "- 'sound_events': be AGGRESSIVE — aim to cover at least 80% of actions, inventing plausible ambient sounds for seemingly silent ones. Include movements, object handling, environment, body sounds, eating/drinking, machinery, and impacts.\n"
+    "- Each sound_event has 'sound', a specific description reflecting materials and environment (e.g., \"footsteps on gravel\" not \"footsteps\"), and 'trigger_phrase', an exact substring of the text where the sound occurs."
+)
+
 SFX_SYSTEM_PROMPT = (
     "You are a sound effects detection assistant for audiobook production.\n"
     "Your goal is to create an immersive audio experience by identifying EVERY possible sound effect opportunity.\n"
     "Given a piece of text, extract ALL actions that occur in the sentence, describe each action, and identify sound effects for MAXIMUM immersion.\n"
     "Rules:\n"
-    "- Return JSON only: {\"actions\": [string], \"action_description\": [string], \"sound_events\": [{\"sound\": string, \"trigger_phrase\": string}]}.\n"
-    "- In 'actions', list ALL actions that occur in the text, whether they produce sound or not (e.g., \"sitting\", \"walking\", \"thinking\", \"breaking glass\", \"opening door\", \"typing on a keyboard\", \"savouring tea\", \"enjoying dinner\").\n"
-    "- In 'action_description', provide a descriptive phrase for EACH action listed in 'actions'. Each description should be a clear verb-noun phrase (e.g., \"person sitting on bench\", \"glass breaking on floor\", \"door opening slowly\"). The number of action descriptions must match the number of actions.\n"
-    "- In 'sound_events', be AGGRESSIVE in finding sound effects. Try to match a sound effect to EVERY action_description, even subtle ones.\n"
-    "- Each sound_event should have:\n"
-    "  - 'sound': a specific description of the sound effect (e.g., \"glass breaking\", \"footsteps on gravel\", \"door creaking open\", \"fabric rustling\", \"breath exhaling\", \"paper crinkling\")\n"
-    "  - 'trigger_phrase': the exact phrase from the text where this sound occurs (e.g., \"slammed the door\", \"footsteps echoed\", \"glass shattered\")\n"
-    "- PRIORITIZE finding sound effects for:\n"
-    "  - Physical movements (sitting, standing, walking, running, jumping, falling)\n"
-    "  - Object interactions (opening/closing doors, handling items, using tools)\n"
-    "  - Environmental sounds (wind, rain, footsteps on different surfaces)\n"
-    "  - Body sounds (breathing, sighing, clothing rustling, joints creaking)\n"
-    "  - Eating/drinking sounds (chewing, swallowing, liquid pouring)\n"
-    "  - Mechanical sounds (engines, machinery, electronic devices)\n"
-    "  - Impact sounds (objects hitting surfaces, collisions, drops)\n"
-    "- Even for subtle actions, find appropriate ambient or background sounds that would enhance immersion.\n"
-    "- Consider the context, materials, and environment when describing sounds (e.g., \"footsteps on wooden floor\" vs \"footsteps on gravel\").\n"
-    "- The trigger_phrase should be a substring of the original text that clearly indicates where the sound occurs.\n"
-    "- ALWAYS provide action_description for every action, and STRIVE to provide sound_events for at least 80% of actions.\n"
-    "- If an action seems silent, think creatively about associated sounds (e.g., \"thinking\" might have \"pencil tapping\" or \"page turning\" if in a study)."
+    + _SFX_GUIDELINES
 )
 
 SFX_USER_PROMPT_TEMPLATE = (
@@ -104,46 +139,346 @@ SFX_USER_PROMPT_TEMPLATE = (
     "Extract all actions from this text, provide descriptive phrases for each action, and identify any sound effects that occur."
 )
 
+# Batch-mode prompts: same analysis rules as the single-item prompts, but many
+# items per request so the system prompt and network round-trip are amortized.
+EMOTION_BATCH_SYSTEM_PROMPT = (
+    EMOTION_SYSTEM_PROMPT
+    + "\nBatch mode:\n"
+    "- The user message contains several items, one per line, formatted as: id | speaker | text.\n"
+    "- Analyze each item independently under the rules above.\n"
+    "- Return exactly one entry per input item and echo each item's id unchanged."
+)
 
-def extract_present_characters(chapter_text: str, llm: LLMClient) -> List[str]:
-    result = llm.chat_json(
-        system_prompt=CHARACTER_SYSTEM_PROMPT,
-        user_prompt=CHARACTER_USER_PROMPT_TEMPLATE + chapter_text,
-        temperature=0.1,
-        max_tokens=700,
+SFX_BATCH_SYSTEM_PROMPT = (
+    SFX_SYSTEM_PROMPT
+    + "\nBatch mode:\n"
+    "- The user message contains several items, one per line, formatted as: id | text.\n"
+    "- Analyze each item independently under the rules above.\n"
+    "- Return exactly one entry per input item and echo each item's id unchanged."
+)
+
+# Fused prompt: emotion/tone analysis and SFX extraction in one call, so each
+# line's text is sent (and billed) once instead of twice.
+ANNOTATE_SYSTEM_PROMPT = (
+    "You are an audiobook annotation assistant.\n"
+    "Given a piece of text and its speaker, analyze the emotional content and tone, extract ALL actions, and identify sound effects for MAXIMUM immersion — all in one pass.\n"
+    "Rules:\n"
+    + _EMOTION_GUIDELINES + "\n"
+    + _SFX_GUIDELINES
+)
+
+ANNOTATE_USER_PROMPT_TEMPLATE = (
+    "SPEAKER: {speaker}\n"
+    "TEXT: {text}\n\n"
+    "Analyze the emotion and tone of this text, extract all actions, and identify any sound effects that occur."
+)
+
+ANNOTATE_BATCH_SYSTEM_PROMPT = (
+    ANNOTATE_SYSTEM_PROMPT
+    + "\nBatch mode:\n"
+    "- The user message contains several items, one per line, formatted as: id | speaker | text.\n"
+    "- Analyze each item independently under the rules above.\n"
+    "- Return exactly one entry per input item and echo each item's id unchanged."
+)
+
+
+# Static fragments of the batch user prompts, built once at import so the
+# per-call work in the hot annotation path is just the item join. (The SDK
+# takes str messages and encodes the request body once, so there is nothing
+# to gain from pre-encoding these to bytes.)
+BATCH_ITEMS_HEADER_SPEAKER = "ITEMS (id | speaker | text):\n"
+BATCH_ITEMS_HEADER_TEXT = "ITEMS (id | text):\n"
+EMOTION_BATCH_USER_SUFFIX = "\n\nAnalyze the emotion and tone of each item."
+SFX_BATCH_USER_SUFFIX = (
+    "\n\nExtract all actions from each item, provide descriptive phrases for each action, and identify any sound effects that occur."
+)
+ANNOTATE_BATCH_USER_SUFFIX = (
+    "\n\nAnalyze the emotion and tone of each item, extract all actions, and identify any sound effects that occur."
+)
+
+# Bump whenever the chapter-level prompts above change so stale memoized
+# results are not reused.
+PROMPT_VERSION = 1
+
+
+def _chapter_memo_key(stage: str, chapter_text: str, llm: LLMClient, extra: str = "") -> str:
+    """Cache key for a whole-chapter result: content hash + model + prompt version."""
+    raw = (
+        f"{stage}|{PROMPT_VERSION}|{llm.model}|{extra}|".encode("utf-8")
+        + chapter_text.encode("utf-8")
     )
-    characters = result.get("characters", [])
+    return hashlib.blake2b(raw, digest_size=32).hexdigest()
+
+
+# JSON Schema for the character extraction call (Structured Outputs).
+CHARACTERS_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "characters": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["characters"],
+    "additionalProperties": False,
+}
+
+
+# JSON Schemas for the per-line annotation calls (Structured Outputs). The
+# server guarantees these shapes, so the prompts no longer restate them and
+# the parse never needs a recovery path.
+_SOUND_EVENT_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "sound": {"type": "string"},
+        "trigger_phrase": {"type": "string"},
+    },
+    "required": ["sound", "trigger_phrase"],
+    "additionalProperties": False,
+}
+
+# Emotion and tone come back as indices into EMOTIONS/TONES; strict mode
+# rejects min/max bounds, so range checks happen client-side in _emotion_entry.
+_EMOTION_PROPERTIES: Dict[str, Any] = {
+    "e": {"type": "integer"},
+    "t": {"type": "integer"},
+}
+
+_SFX_PROPERTIES: Dict[str, Any] = {
+    "actions": {"type": "array", "items": {"type": "string"}},
+    "action_description": {"type": "array", "items": {"type": "string"}},
+    "sound_events": {"type": "array", "items": _SOUND_EVENT_SCHEMA},
+}
+
+
+def _result_schema(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Schema for a single-item result with the given fields."""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def _batch_schema(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Schema for a batch result: {"results": [{"id": int, ...fields}]}."""
+    item_properties = {"id": {"type": "integer"}, **properties}
+    return {
+        "type": "object",
+        "properties": {
+            "results": {"type": "array", "items": _result_schema(item_properties)},
+        },
+        "required": ["results"],
+        "additionalProperties": False,
+    }
+
+
+EMOTION_SCHEMA = _result_schema(_EMOTION_PROPERTIES)
+SFX_SCHEMA = _result_schema(_SFX_PROPERTIES)
+ANNOTATION_SCHEMA = _result_schema({**_EMOTION_PROPERTIES, **_SFX_PROPERTIES})
+EMOTION_BATCH_SCHEMA = _batch_schema(_EMOTION_PROPERTIES)
+SFX_BATCH_SCHEMA = _batch_schema(_SFX_PROPERTIES)
+ANNOTATION_BATCH_SCHEMA = _batch_schema({**_EMOTION_PROPERTIES, **_SFX_PROPERTIES})
+
+
+def _lines_schema(characters: List[str]) -> Dict[str, Any]:
+    """JSON Schema for the labeling call; speakers are constrained to the
+    detected character list plus Narrator."""
+    speakers = list(dict.fromkeys(list(characters) + ["Narrator"]))
+    return {
+        "type": "object",
+        "properties": {
+            "lines": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "speaker": {"type": "string", "enum": speakers},
+                        "text": {"type": "string"},
+                    },
+                    "required": ["speaker", "text"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["lines"],
+        "additionalProperties": False,
+    }
+
+
+def _chunk_chapter(
+    text: str,
+    target_chars: int = 6000,
+    overlap_chars: int = 600,
+) -> List[str]:
+    """Split a chapter into windows on paragraph boundaries.
+
+    Windows are sized in characters (roughly 4 chars per token) so each one
+    stays comfortably inside the model's context, and consecutive windows
+    share a small overlap so dialogue spanning a boundary keeps its context.
+    """
+    if len(text) <= target_chars:
+        return [text]
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_len = 0
+    for paragraph in text.split("\n\n"):
+        paragraph_len = len(paragraph) + 2
+        if current and current_len + paragraph_len > target_chars:
+            chunks.append("\n\n".join(current))
+            # Carry the tail of the finished window as overlap
+            tail: List[str] = []
+            tail_len = 0
+            for prev in reversed(current):
+                tail.insert(0, prev)
+                tail_len += len(prev) + 2
+                if tail_len >= overlap_chars:
+                    break
+            current = tail
+            current_len = tail_len
+        current.append(paragraph)
+        current_len += paragraph_len
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _merge_character_lists(lists: List[List[str]]) -> List[str]:
+    """Union per-chunk character lists, deduping case-insensitively and
+    preferring the longer (more canonical) spelling of each name."""
+    by_key: Dict[str, str] = {}
+    order: List[str] = []
+    for names in lists:
+        for name in names:
+            if not isinstance(name, str):
+                continue
+            clean = name.strip()
+            if not clean:
+                continue
+            key = clean.casefold()
+            if key not in by_key:
+                by_key[key] = clean
+                order.append(key)
+            elif len(clean) > len(by_key[key]):
+                by_key[key] = clean
+    merged = [by_key[key] for key in order][:20]
     # Ensure Narrator is included
-    if "Narrator" not in characters:
-        characters.append("Narrator")
-    return characters
+    if "Narrator" not in merged:
+        merged.append("Narrator")
+    return merged
 
 
-def label_lines_with_speakers(
+async def extract_present_characters_async(chapter_text: str, llm: LLMClient) -> List[str]:
+    """Extract characters map-reduce style: one call per chapter window,
+    fired concurrently, with the per-window lists merged afterwards.
+
+    The merged result is memoized by chapter content hash so re-runs of the
+    same chapter skip straight past this step."""
+    memo_key = _chapter_memo_key("characters", chapter_text, llm)
+    memoized = llm.cache_get(memo_key)
+    if memoized is not None:
+        return memoized["characters"]
+    chunks = _chunk_chapter(chapter_text)
+    results = await asyncio.gather(*[
+        llm.chat_structured_async(
+            system_prompt=CHARACTER_SYSTEM_PROMPT,
+            user_prompt=CHARACTER_USER_PROMPT_TEMPLATE + chunk,
+            schema=CHARACTERS_SCHEMA,
+            schema_name="characters",
+            temperature=0.1,
+            max_tokens=700,
+        )
+        for chunk in chunks
+    ])
+    merged = _merge_character_lists([result.get("characters", []) for result in results])
+    llm.cache_put(memo_key, {"characters": merged})
+    return merged
+
+
+def extract_present_characters(chapter_text: str, llm: LLMClient) -> List[str]:
+    return asyncio.run(extract_present_characters_async(chapter_text, llm))
+
+
+def _normalize_lines(
+    lines: List[Dict[str, str]],
+    characters: List[str],
+) -> List[Dict[str, str]]:
+    allowed = frozenset(characters) | {"Narrator"}
+    # Case-insensitive lookup so a model response like "narrator" or "ALICE"
+    # maps back to the canonical name instead of being discarded.
+    canonical = {name.casefold(): name for name in allowed}
+    return [
+        {
+            "speaker": speaker if speaker in allowed
+            else canonical.get(speaker.casefold(), "Narrator"),
+            "text": text,
+        }
+        for item in lines
+        if (text := (item.get("text") or "").strip())
+        and (speaker := (item.get("speaker") or "Narrator").strip() or "Narrator")
+    ]
+
+
+def _merge_labeled_chunks(chunk_lines: List[List[Dict[str, str]]]) -> List[Dict[str, str]]:
+    """Concatenate per-window line lists in order, dropping lines at the head
+    of each window that duplicate the tail of the previous one (the overlap)."""
+    merged: List[Dict[str, str]] = []
+    for lines in chunk_lines:
+        if merged and lines:
+            drop = 0
+            for k in range(min(len(merged), len(lines)), 0, -1):
+                if [l["text"] for l in merged[-k:]] == [l["text"] for l in lines[:k]]:
+                    drop = k
+                    break
+            lines = lines[drop:]
+        merged.extend(lines)
+    return merged
+
+
+async def label_lines_with_speakers_async(
     chapter_text: str,
     characters: List[str],
     llm: LLMClient,
 ) -> List[Dict[str, str]]:
-    user_prompt = LABEL_USER_PROMPT_TEMPLATE.format(characters=characters) + chapter_text
-    result = llm.chat_json(
-        system_prompt=LABEL_SYSTEM_PROMPT,
-        user_prompt=user_prompt,
-        temperature=0.2,
-        max_tokens=4000,
+    """Label lines per chapter window concurrently and stitch the results.
+
+    Memoized by chapter content hash and character list, like character
+    extraction."""
+    memo_key = _chapter_memo_key("labels", chapter_text, llm, extra="|".join(characters))
+    memoized = llm.cache_get(memo_key)
+    if memoized is not None:
+        return memoized["lines"]
+    chunks = _chunk_chapter(chapter_text)
+    schema = _lines_schema(characters)
+    # Build the static prompt prefix once: compact JSON for the character
+    # list rather than list.__str__ (stable format, fewer prompt tokens),
+    # formatted into the template a single time rather than per chunk.
+    user_prefix = LABEL_USER_PROMPT_TEMPLATE.format(
+        characters=orjson.dumps(characters).decode()
     )
-    lines = result.get("lines", [])
-    # Normalize and filter
-    normalized: List[Dict[str, str]] = []
-    allowed = set(characters) | {"Narrator"}
-    for item in lines:
-        text = (item.get("text") or "").strip()
-        speaker = (item.get("speaker") or "Narrator").strip()
-        if not text:
-            continue
-        if speaker not in allowed:
-            speaker = "Narrator"
-        normalized.append({"speaker": speaker, "text": text})
-    return normalized
+    results = await asyncio.gather(*[
+        llm.chat_structured_async(
+            system_prompt=LABEL_SYSTEM_PROMPT,
+            user_prompt=user_prefix + chunk,
+            schema=schema,
+            schema_name="labeled_lines",
+            temperature=0.2,
+            max_tokens=4000,
+        )
+        for chunk in chunks
+    ])
+    merged = _merge_labeled_chunks([
+        _normalize_lines(result.get("lines", []), characters) for result in results
+    ])
+    llm.cache_put(memo_key, {"lines": merged})
+    return merged
+
+
+def label_lines_with_speakers(
+    chapter_text: str,
+    characters: List[str],
+    llm: LLMClient,
+) -> List[Dict[str, str]]:
+    return asyncio.run(label_lines_with_speakers_async(chapter_text, characters, llm))
 
 
 def detect_emotion_and_tone(
@@ -153,16 +488,60 @@ def detect_emotion_and_tone(
 ) -> Dict[str, str]:
     """Detect emotion and tone for a given text and speaker."""
     user_prompt = EMOTION_USER_PROMPT_TEMPLATE.format(speaker=speaker, text=text)
-    result = llm.chat_json(
+    result = llm.chat_structured_cheap(
         system_prompt=EMOTION_SYSTEM_PROMPT,
         user_prompt=user_prompt,
+        schema=EMOTION_SCHEMA,
+        schema_name="emotion_tone",
         temperature=0.3,
         max_tokens=200,
     )
-    return {
-        "emotion": result.get("emotion", "neutral"),
-        "tone": result.get("tone", "neutral")
-    }
+    return _emotion_entry(result)
+
+
+async def detect_emotion_and_tone_async(
+    text: str,
+    speaker: str,
+    llm: LLMClient,
+) -> Dict[str, str]:
+    """Async variant of detect_emotion_and_tone for concurrent per-sentence processing."""
+    user_prompt = EMOTION_USER_PROMPT_TEMPLATE.format(speaker=speaker, text=text)
+    result = await llm.chat_structured_cheap_async(
+        system_prompt=EMOTION_SYSTEM_PROMPT,
+        user_prompt=user_prompt,
+        schema=EMOTION_SCHEMA,
+        schema_name="emotion_tone",
+        temperature=0.3,
+        max_tokens=200,
+    )
+    return _emotion_entry(result)
+
+
+# Word stems that plausibly produce a sound effect. Short dialogue tags and
+# pure emotion description never yield sound_events, so a line matching none
+# of these skips the SFX LLM call outright. (The fused annotation path still
+# sends every line because it needs emotion/tone regardless.)
+_SOUND_WORD_STEMS = (
+    "slam", "crash", "bang", "creak", "shatter", "smash", "knock", "thud",
+    "click", "clack", "clatter", "rattle", "rustle", "whisper", "scream",
+    "shout", "yell", "cry", "sob", "laugh", "giggle", "sigh", "gasp",
+    "breath", "cough", "hum", "buzz", "ring", "chime", "beep", "step",
+    "stomp", "walk", "run", "jump", "fall", "drop", "hit", "strike",
+    "pound", "tap", "drum", "splash", "drip", "pour", "gulp", "swallow",
+    "chew", "sip", "slurp", "crunch", "open", "close", "shut", "tear",
+    "rip", "crack", "snap", "pop", "whir", "roar", "rumble", "screech",
+    "squeak", "squeal", "hiss", "howl", "whistle", "echo", "thunder",
+    "rain", "wind", "engine", "door", "glass", "bell", "siren", "knife",
+    "footstep", "clothes", "fabric", "paper", "type", "write", "sat",
+    "sit", "stand", "stood", "grab", "throw", "threw", "slid", "slide",
+)
+SOUND_RE = re.compile(r"\b(?:" + "|".join(_SOUND_WORD_STEMS) + r")\w*", re.IGNORECASE)
+
+_EMPTY_SFX: Dict[str, Any] = {
+    "actions": [],
+    "action_description": [],
+    "sound_events": [],
+}
 
 
 def detect_sound_effects(
@@ -170,10 +549,37 @@ def detect_sound_effects(
     llm: LLMClient,
 ) -> Dict[str, Any]:
     """Detect actions and their associated sound effects for a given text."""
+    if not SOUND_RE.search(text):
+        return dict(_EMPTY_SFX)
+    user_prompt = SFX_USER_PROMPT_TEMPLATE.format(text=text)
+    result = llm.chat_structured_cheap(
+        system_prompt=SFX_SYSTEM_PROMPT,
+        user_prompt=user_prompt,
+        schema=SFX_SCHEMA,
+        schema_name="sound_effects",
+        temperature=0.2,
+        max_tokens=400,
+    )
+    return {
+        "actions": result.get("actions", []),
+        "action_description": result.get("action_description", []),
+        "sound_events": result.get("sound_events", [])
+    }
+
+
+async def detect_sound_effects_async(
+    text: str,
+    llm: LLMClient,
+) -> Dict[str, Any]:
+    """Async variant of detect_sound_effects for concurrent per-sentence processing."""
+    if not SOUND_RE.search(text):
+        return dict(_EMPTY_SFX)
     user_prompt = SFX_USER_PROMPT_TEMPLATE.format(text=text)
-    result = llm.chat_json(
+    result = await llm.chat_structured_cheap_async(
         system_prompt=SFX_SYSTEM_PROMPT,
         user_prompt=user_prompt,
+        schema=SFX_SCHEMA,
+        schema_name="sound_effects",
         temperature=0.2,
         max_tokens=400,
     )
@@ -184,6 +590,197 @@ def detect_sound_effects(
     }
 
 
+def _decode_label(index: Any, options: tuple) -> str:
+    """Map an enum index back to its label; out-of-range falls back to neutral."""
+    if isinstance(index, int) and 0 <= index < len(options):
+        return options[index]
+    return "neutral"
+
+
+def _emotion_entry(entry: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        "emotion": _decode_label(entry.get("e"), EMOTIONS),
+        "tone": _decode_label(entry.get("t"), TONES)
+    }
+
+
+def _sfx_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "actions": entry.get("actions", []),
+        "action_description": entry.get("action_description", []),
+        "sound_events": entry.get("sound_events", [])
+    }
+
+
+async def detect_emotion_and_tone_batch_async(
+    items: List[Dict[str, Any]],
+    llm: LLMClient,
+) -> Dict[int, Dict[str, str]]:
+    """Detect emotion and tone for many items in one LLM call.
+
+    Each item is {"id": int, "speaker": str, "text": str}. Returns a mapping
+    from id to {"emotion", "tone"}; items the model skipped fall back to neutral.
+    """
+    user_prompt = (
+        BATCH_ITEMS_HEADER_SPEAKER
+        + "\n".join(f"{item['id']} | {item['speaker']} | {item['text']}" for item in items)
+        + EMOTION_BATCH_USER_SUFFIX
+    )
+    try:
+        result = await llm.chat_structured_cheap_async(
+            system_prompt=EMOTION_BATCH_SYSTEM_PROMPT,
+            user_prompt=user_prompt,
+            schema=EMOTION_BATCH_SCHEMA,
+            schema_name="emotion_tone_batch",
+            temperature=0.3,
+            max_tokens=200 + 40 * len(items),
+        )
+    except Exception as e:
+        # Degrade to per-item defaults instead of aborting the whole chapter:
+        # the client has already retried transient errors with backoff.
+        print(f"Warning: emotion/tone batch of {len(items)} failed ({e}); using defaults")
+        result = {}
+    by_id = {
+        entry["id"]: _emotion_entry(entry)
+        for entry in result.get("results", [])
+        if isinstance(entry.get("id"), int)
+    }
+    return {
+        item["id"]: by_id.get(item["id"], {"emotion": "neutral", "tone": "neutral"})
+        for item in items
+    }
+
+
+async def detect_sound_effects_batch_async(
+    items: List[Dict[str, Any]],
+    llm: LLMClient,
+) -> Dict[int, Dict[str, Any]]:
+    """Detect actions and sound effects for many items in one LLM call.
+
+    Each item is {"id": int, "text": str}. Returns a mapping from id to the
+    same shape detect_sound_effects produces; skipped items come back empty.
+    """
+    # Lines with no sound-suggesting word never yield sound_events; answer
+    # them locally and only send the remainder to the model.
+    candidates = [item for item in items if SOUND_RE.search(item["text"])]
+    if not candidates:
+        return {item["id"]: dict(_EMPTY_SFX) for item in items}
+    user_prompt = (
+        BATCH_ITEMS_HEADER_TEXT
+        + "\n".join(f"{item['id']} | {item['text']}" for item in candidates)
+        + SFX_BATCH_USER_SUFFIX
+    )
+    try:
+        result = await llm.chat_structured_cheap_async(
+            system_prompt=SFX_BATCH_SYSTEM_PROMPT,
+            user_prompt=user_prompt,
+            schema=SFX_BATCH_SCHEMA,
+            schema_name="sound_effects_batch",
+            temperature=0.2,
+            max_tokens=200 + 150 * len(candidates),
+        )
+    except Exception as e:
+        # Degrade to per-item defaults instead of aborting the whole chapter:
+        # the client has already retried transient errors with backoff.
+        print(f"Warning: sound-effect batch of {len(candidates)} failed ({e}); using defaults")
+        result = {}
+    by_id = {
+        entry["id"]: _sfx_entry(entry)
+        for entry in result.get("results", [])
+        if isinstance(entry.get("id"), int)
+    }
+    empty = {"actions": [], "action_description": [], "sound_events": []}
+    return {item["id"]: by_id.get(item["id"], dict(empty)) for item in items}
+
+
+def _annotation_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {**_emotion_entry(entry), **_sfx_entry(entry)}
+
+
+def annotate_line(
+    text: str,
+    speaker: str,
+    llm: LLMClient,
+) -> Dict[str, Any]:
+    """Detect emotion, tone, actions, and sound effects in a single LLM call.
+
+    Fuses detect_emotion_and_tone and detect_sound_effects so the line's text
+    is sent over the network once instead of twice.
+    """
+    user_prompt = ANNOTATE_USER_PROMPT_TEMPLATE.format(speaker=speaker, text=text)
+    result = llm.chat_structured_cheap(
+        system_prompt=ANNOTATE_SYSTEM_PROMPT,
+        user_prompt=user_prompt,
+        schema=ANNOTATION_SCHEMA,
+        schema_name="annotation",
+        temperature=0.2,
+        max_tokens=500,
+    )
+    return _annotation_entry(result)
+
+
+async def annotate_line_async(
+    text: str,
+    speaker: str,
+    llm: LLMClient,
+) -> Dict[str, Any]:
+    """Async variant of annotate_line for concurrent per-sentence processing."""
+    user_prompt = ANNOTATE_USER_PROMPT_TEMPLATE.format(speaker=speaker, text=text)
+    result = await llm.chat_structured_cheap_async(
+        system_prompt=ANNOTATE_SYSTEM_PROMPT,
+        user_prompt=user_prompt,
+        schema=ANNOTATION_SCHEMA,
+        schema_name="annotation",
+        temperature=0.2,
+        max_tokens=500,
+    )
+    return _annotation_entry(result)
+
+
+async def annotate_lines_batch_async(
+    items: List[Dict[str, Any]],
+    llm: LLMClient,
+) -> Dict[int, Dict[str, Any]]:
+    """Annotate many items (emotion, tone, actions, sound effects) in one LLM call.
+
+    Each item is {"id": int, "speaker": str, "text": str}. Returns a mapping
+    from id to the fused annotation dict; skipped items fall back to
+    neutral/empty defaults.
+    """
+    user_prompt = (
+        BATCH_ITEMS_HEADER_SPEAKER
+        + "\n".join(f"{item['id']} | {item['speaker']} | {item['text']}" for item in items)
+        + ANNOTATE_BATCH_USER_SUFFIX
+    )
+    try:
+        result = await llm.chat_structured_cheap_async(
+            system_prompt=ANNOTATE_BATCH_SYSTEM_PROMPT,
+            user_prompt=user_prompt,
+            schema=ANNOTATION_BATCH_SCHEMA,
+            schema_name="annotation_batch",
+            temperature=0.2,
+            max_tokens=200 + 180 * len(items),
+        )
+    except Exception as e:
+        # Degrade to per-item defaults instead of aborting the whole chapter:
+        # the client has already retried transient errors with backoff.
+        print(f"Warning: annotation batch of {len(items)} failed ({e}); using defaults")
+        result = {}
+    by_id = {
+        entry["id"]: _annotation_entry(entry)
+        for entry in result.get("results", [])
+        if isinstance(entry.get("id"), int)
+    }
+    fallback = {
+        "emotion": "neutral",
+        "tone": "neutral",
+        "actions": [],
+        "action_description": [],
+        "sound_events": []
+    }
+    return {item["id"]: by_id.get(item["id"], dict(fallback)) for item in items}
+
+
 def format_sentence_with_annotations(
     sentence: str,
     emotion: str,
@@ -195,82 +792,167 @@ def format_sentence_with_annotations(
     
     Format: [emotion, tone] word word [sound] word word
     """
-    # Start with emotion and tone annotation
-    formatted = f"[{emotion}, {tone}] {sentence}"
-    
-    # Insert sound effects at their trigger points
-    if sound_events:
-        # Sort sound events by their position in the sentence (last to first to preserve indices)
-        events_with_pos = []
-        for event in sound_events:
-            trigger = event.get("trigger_phrase", "")
-            sound = event.get("sound", "")
-            if trigger and sound:
-                # Find position of trigger phrase in sentence (case-insensitive)
-                pos = sentence.lower().find(trigger.lower())
-                if pos != -1:
-                    # Calculate the end position of the trigger phrase
-                    end_pos = pos + len(trigger)
-                    events_with_pos.append((end_pos, sound, trigger))
-        
-        # Sort by position (descending) to insert from end to start
-        events_with_pos.sort(reverse=True, key=lambda x: x[0])
-        
-        # Insert sound annotations after trigger phrases
-        result = sentence
-        for end_pos, sound, trigger in events_with_pos:
-            result = result[:end_pos] + f" [{sound}]" + result[end_pos:]
-        
-        formatted = f"[{emotion}, {tone}] {result}"
-    
-    return formatted
+    if not sound_events:
+        return f"[{emotion}, {tone}] {sentence}"
+
+    # Locate each trigger phrase once against a single lowered copy of the
+    # sentence (case-insensitive match, original casing preserved in output).
+    lowered = sentence.lower()
+    candidates = [
+        (event["trigger_phrase"].lower(), event["sound"])
+        for event in sound_events
+        if event.get("trigger_phrase") and event.get("sound")
+    ]
+
+    # With several triggers, one Aho-Corasick pass over the sentence finds
+    # them all; otherwise (or without pyahocorasick) fall back to str.find.
+    triggers = {trigger for trigger, _ in candidates}
+    if ahocorasick is not None and len(triggers) > 1:
+        automaton = ahocorasick.Automaton()
+        for trigger in triggers:
+            automaton.add_word(trigger, trigger)
+        automaton.make_automaton()
+        positions = {}
+        # iter() yields matches in end-index order, so the first match seen
+        # for a trigger is its first occurrence, same as str.find.
+        for end_index, trigger in automaton.iter(lowered):
+            if trigger not in positions:
+                positions[trigger] = end_index + 1
+    else:
+        positions = {}
+        for trigger in triggers:
+            pos = lowered.find(trigger)
+            if pos != -1:
+                positions[trigger] = pos + len(trigger)
+
+    insertions = []
+    for trigger, sound in candidates:
+        end_pos = positions.get(trigger)
+        if end_pos is not None:
+            # Annotation goes right after the trigger phrase
+            insertions.append((end_pos, f" [{sound}]"))
+
+    # Stable ascending sort over the reversed collection order keeps
+    # same-position annotations in the order the old end-to-start
+    # insertion produced.
+    insertions.reverse()
+    insertions.sort(key=lambda item: item[0])
+
+    # Assemble in one pass instead of rebuilding the string per insertion
+    parts = [f"[{emotion}, {tone}] "]
+    prev = 0
+    for end_pos, annotation in insertions:
+        parts.append(sentence[prev:end_pos])
+        parts.append(annotation)
+        prev = end_pos
+    parts.append(sentence[prev:])
+    return "".join(parts)
 
 
 def process_chapter(
     chapter_text: str,
     *,
     model: str = "gpt-4o-mini",
+    annotation_model: Optional[str] = None,
+    concurrency: Optional[int] = None,
+    batch_size: int = 16,
 ) -> Dict[str, Any]:
-    llm = LLMClient(model=model)
-    characters = extract_present_characters(chapter_text, llm)
-    lines = label_lines_with_speakers(chapter_text, characters, llm)
-    
-    # Process each line to add emotion, tone, and SFX detection
-    processed_sentences = {}
+    # The per-line annotation pass is a constrained classification task and
+    # dominates call volume, so it can run on a smaller model than the
+    # chapter-level extraction and labeling calls.
+    llm = LLMClient(model=model, classifier_model=annotation_model)
+
+    if concurrency is None:
+        concurrency = llm.concurrency_limit
+
+    # All three LLM stages run under one event loop: pooled keep-alive
+    # connections are bound to the loop that created them, so a fresh
+    # asyncio.run per stage would reuse stale sockets at every stage
+    # boundary (and keep paying cold TCP/TLS handshakes).
+    async def _run():
+        characters = await extract_present_characters_async(chapter_text, llm)
+        lines = await label_lines_with_speakers_async(chapter_text, characters, llm)
+
+        # Deduplicate before annotating: narrator filler and recurring short
+        # lines repeat many times per chapter, and identical (speaker, text)
+        # pairs always get identical annotations. Annotate each unique pair
+        # once, then broadcast the result to every occurrence.
+        unique_items = []
+        unique_index = {}
+        line_to_unique = []
+        for line in lines:
+            pair = (line["speaker"], line["text"])
+            idx = unique_index.get(pair)
+            if idx is None:
+                idx = len(unique_items)
+                unique_index[pair] = idx
+                unique_items.append(line)
+            line_to_unique.append(idx)
+
+        # Group unique lines into id-tagged batches so the fused system
+        # prompt is amortized across batch_size lines per request, then fire
+        # the batches concurrently; the semaphore keeps in-flight requests
+        # within the client's connection pool.
+        batches = []
+        for start in range(0, len(unique_items), batch_size):
+            batches.append([
+                {"id": start + j, "speaker": line["speaker"], "text": line["text"]}
+                for j, line in enumerate(unique_items[start:start + batch_size])
+            ])
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _bounded(coro):
+            async with semaphore:
+                return await coro
+
+        tasks = [_bounded(annotate_lines_batch_async(batch, llm)) for batch in batches]
+        annotations_by_id = {}
+        for result_map in await asyncio.gather(*tasks):
+            annotations_by_id.update(result_map)
+        return characters, lines, unique_items, line_to_unique, annotations_by_id
+
+    characters, lines, unique_items, line_to_unique, annotations = asyncio.run(_run())
+
+    # Format each unique line once; duplicates share the string.
+    formatted_by_unique = [
+        format_sentence_with_annotations(
+            line["text"],
+            annotations[u]["emotion"],
+            annotations[u]["tone"],
+            annotations[u]["sound_events"],
+        )
+        for u, line in enumerate(unique_items)
+    ]
+
+    # Zip results back in line order. Sentences are an ordered list with a
+    # numeric id rather than a dict keyed by zero-padded strings: insertion
+    # order already carries the sequence, and consumers no longer need to
+    # re-sort string keys.
+    processed_sentences = []
     for i, line in enumerate(lines):
-        sentence_id = f"sentence_{i+1:04d}"
         text = line["text"]
         speaker = line["speaker"]
-        
-        # Detect emotion and tone
-        emotion_data = detect_emotion_and_tone(text, speaker, llm)
-        
-        # Detect sound effects
-        sfx_data = detect_sound_effects(text, llm)
-        
-        # Format sentence with inline annotations
-        formatted_sentence = format_sentence_with_annotations(
-            text,
-            emotion_data["emotion"],
-            emotion_data["tone"],
-            sfx_data["sound_events"]
-        )
-        
-        processed_sentences[sentence_id] = {
+        u = line_to_unique[i]
+        annotation = annotations[u]
+        formatted_sentence = formatted_by_unique[u]
+
+        processed_sentences.append({
+            "id": i + 1,
             "sentence": text,
             "formatted_sentence": formatted_sentence,
             "speaker_info": {
                 "speaker": speaker,
-                "emotion": emotion_data["emotion"],
-                "tone": emotion_data["tone"]
+                "emotion": annotation["emotion"],
+                "tone": annotation["tone"]
             },
             "sfx_info": {
-                "actions": sfx_data["actions"],
-                "action_description": sfx_data["action_description"],
-                "sound_events": sfx_data["sound_events"]
+                "actions": annotation["actions"],
+                "action_description": annotation["action_description"],
+                "sound_events": annotation["sound_events"]
             }
-        }
-    
+        })
+
     return {
         "characters": characters,
         "sentences": processed_sentences